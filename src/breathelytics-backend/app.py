@@ -6,23 +6,40 @@ Integrates with the ML pipeline for real-time audio processing and classificatio
 """
 
 import os
+import json
 import logging
 import tempfile
-import uuid
+import threading
+import time
+import zlib
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest, InternalServerError
-import pandas as pd
 
-from pipeline import predict_respiratory_condition, create_respiratory_pipeline
-from models import PredictionRequest, PredictionResponse, HealthCheckResponse, EnhancedPredictionResponse, AIInsightResponse
-from utils import setup_logging, validate_audio_file, cleanup_temp_files
 from config import Config
+
+# orjson encodes the prediction payload several times faster than the stdlib
+# encoder Flask's jsonify uses, and handles NumPy scalars/arrays natively
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Create temp/logs/cache directories once here rather than on every request
+Config.init_directories()
+
+# Persist numba-compiled librosa kernels across restarts. Must be set before
+# librosa (and therefore numba) is first imported via the pipeline module,
+# which is imported lazily so the server can bind before the ML stack loads.
+os.environ.setdefault('NUMBA_CACHE_DIR', Config.CACHE_DIR)
+
+from models import PredictionRequest, PredictionResponse, HealthCheckResponse, EnhancedPredictionResponse, AIInsightResponse
+from utils import setup_logging, validate_audio_file, cleanup_temp_files, spool_upload
 from llm_service import generate_medical_insights
 
 # Initialize Flask app
@@ -43,18 +60,195 @@ logger = setup_logging()
 
 # Global variables for pipeline caching
 _preprocessing_pipeline = None
-_model_loaded = False
+_pipeline_lock = threading.Lock()
+_model = None
+_model_lock = threading.Lock()
+
+# Health checks are polled frequently; re-stat the model file at most every few seconds
+MODEL_STATUS_TTL_SECONDS = 5.0
+_model_status_cache: Dict[str, Any] = {'checked_at': float('-inf'), 'exists': False}
 
 
 def get_preprocessing_pipeline():
     """Get or create the preprocessing pipeline (singleton pattern)."""
     global _preprocessing_pipeline
     if _preprocessing_pipeline is None:
-        logger.info("Initializing preprocessing pipeline...")
-        _preprocessing_pipeline = create_respiratory_pipeline()
+        # Requests arriving during warmup wait for it instead of building a second copy
+        with _pipeline_lock:
+            if _preprocessing_pipeline is None:
+                from pipeline import create_respiratory_pipeline
+                
+                logger.info("Initializing preprocessing pipeline...")
+                _preprocessing_pipeline = create_respiratory_pipeline()
     return _preprocessing_pipeline
 
 
+def get_model():
+    """Get or load the respiratory classifier once per process (singleton pattern)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from pipeline import load_classifier
+                
+                _model = load_classifier(app.config['MODEL_PATH'])
+    return _model
+
+
+def warm_up() -> None:
+    """Build the pipeline, run it once on synthetic audio and load the model ahead of the first request."""
+    from pipeline import warm_up_pipeline
+    
+    try:
+        warm_up_pipeline(get_preprocessing_pipeline())
+    except Exception as e:
+        logger.error(f"Failed to warm up pipeline: {str(e)}")
+    try:
+        get_model()
+    except Exception as e:
+        logger.error(f"Failed to load model during warmup: {str(e)}")
+
+
+def start_warm_up() -> threading.Thread:
+    """
+    Warm up in a background thread so the first request doesn't pay for it.
+    
+    Called by the server entry points rather than at import time, so importing
+    the module (tests, tooling) doesn't build the librosa/model stack.
+    
+    Returns:
+        threading.Thread: The started daemon thread
+    """
+    thread = threading.Thread(target=warm_up, name='pipeline-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+DISEASES: List[Dict[str, Any]] = [
+    {
+        "name": "Asthma",
+        "description": "A respiratory condition where airways narrow and swell, producing extra mucus.",
+        "symptoms": ["Shortness of breath", "Chest tightness", "Wheezing", "Coughing"],
+        "severity": "Moderate"
+    },
+    {
+        "name": "Bronchiectasis",
+        "description": "A condition where the bronchi are abnormally widened and thickened.",
+        "symptoms": ["Persistent cough", "Daily sputum production", "Shortness of breath"],
+        "severity": "Severe"
+    },
+    {
+        "name": "Bronchiolitis",
+        "description": "Inflammation of the small airways in the lungs.",
+        "symptoms": ["Cough", "Wheezing", "Shortness of breath", "Fever"],
+        "severity": "Mild to Moderate"
+    },
+    {
+        "name": "COPD",
+        "description": "Chronic Obstructive Pulmonary Disease - progressive lung disease.",
+        "symptoms": ["Chronic cough", "Shortness of breath", "Excessive mucus"],
+        "severity": "Severe"
+    },
+    {
+        "name": "Healthy",
+        "description": "Normal respiratory function with no detected abnormalities.",
+        "symptoms": ["None"],
+        "severity": "None"
+    },
+    {
+        "name": "LRTI",
+        "description": "Lower Respiratory Tract Infection affecting lungs and airways.",
+        "symptoms": ["Productive cough", "Fever", "Shortness of breath"],
+        "severity": "Moderate"
+    },
+    {
+        "name": "Pneumonia",
+        "description": "Infection that inflames air sacs in one or both lungs.",
+        "symptoms": ["Cough with phlegm", "Fever", "Chills", "Difficulty breathing"],
+        "severity": "Severe"
+    },
+    {
+        "name": "URTI",
+        "description": "Upper Respiratory Tract Infection affecting nose, throat, and sinuses.",
+        "symptoms": ["Runny nose", "Sore throat", "Cough", "Sneezing"],
+        "severity": "Mild"
+    }
+]
+
+_PIPELINE_STATUS: Dict[str, Any] = {
+    "pipeline_loaded": True,
+    "target_duration": 7.8560090702947845,
+    "excluded_features": ['mel_spectrogram_min', 'chroma_stft_max'],
+    "steps": [
+        "AudioLoader",
+        "AudioTrimmer",
+        "FeatureExtractor",
+        "FeatureStatisticsCalculator"
+    ]
+}
+
+
+class _StaticJSONPayload:
+    """
+    JSON payload encoded once at import, with only the timestamp filled in per request.
+    
+    The static prefix is also fed through a gzip compressor up front; each request
+    copies that primed compressor and compresses just the short timestamp tail.
+    """
+    
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.prefix = json.dumps(payload).encode()[:-1] + b', "timestamp": "'
+        self._gzip = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits=31 selects gzip framing
+        self._gzip_head = self._gzip.compress(self.prefix)
+    
+    def response(self, timestamp: str, accepts_gzip: bool) -> Response:
+        """Build the response body, gzip-encoded when the client accepts it."""
+        tail = timestamp.encode() + b'"}'
+        if accepts_gzip:
+            compressor = self._gzip.copy()
+            response = Response(
+                self._gzip_head + compressor.compress(tail) + compressor.flush(),
+                mimetype='application/json'
+            )
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.prefix + tail, mimetype='application/json')
+        
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+_DISEASES_PAYLOAD = _StaticJSONPayload({"diseases": DISEASES, "total_count": len(DISEASES)})
+_PIPELINE_STATUS_PAYLOAD = _StaticJSONPayload(_PIPELINE_STATUS)
+
+
+def _static_json_response(payload: _StaticJSONPayload) -> Response:
+    """Serve a precomputed payload stamped with the current request's timestamp."""
+    # Werkzeug parses q-values, so "gzip;q=0" counts as a refusal
+    return payload.response(g.timestamp, request.accept_encodings['gzip'] > 0)
+
+
+def json_response(obj: Dict[str, Any]) -> Response:
+    """
+    Encode a JSON response with orjson, falling back to jsonify if it isn't installed.
+    
+    Keys are sorted to match jsonify's output.
+    """
+    if orjson is None:
+        return jsonify(obj)
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS),
+        mimetype='application/json'
+    )
+
+
+@app.before_request
+def stamp_request() -> None:
+    """Format the response timestamp once per request for all handlers to share."""
+    g.timestamp = datetime.utcnow().isoformat()
+    g.start_ns = time.perf_counter_ns()
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check() -> Dict[str, Any]:
     """
@@ -64,27 +258,29 @@ def health_check() -> Dict[str, Any]:
         Dict[str, Any]: Health status information
     """
     try:
-        model_path = os.path.join(app.config['MODEL_DIR'], 'respiratory_classifier.pkl')
-        model_exists = os.path.exists(model_path)
+        now = time.monotonic()
+        if now - _model_status_cache['checked_at'] > MODEL_STATUS_TTL_SECONDS:
+            _model_status_cache.update(checked_at=now, exists=os.path.exists(app.config['MODEL_PATH']))
+        model_exists = _model_status_cache['exists']
         
         pipeline_status = "loaded" if _preprocessing_pipeline is not None else "not_loaded"
         
         response = HealthCheckResponse(
             status="healthy",
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=g.timestamp,
             version=app.config['VERSION'],
             model_available=model_exists,
             pipeline_status=pipeline_status
         )
         
-        return jsonify(response.dict()), 200
+        return jsonify(response.model_dump()), 200
         
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return jsonify({
             "status": "unhealthy",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         }), 500
 
 
@@ -99,8 +295,13 @@ def predict_respiratory_disease() -> Dict[str, Any]:
         Dict[str, Any]: Prediction results with probabilities and metadata
     """
     temp_file_path = None
+    temp_fd = None
     
     try:
+        # Reject oversized uploads before the multipart body is parsed and spooled
+        if request.content_length and request.content_length > app.config['MAX_FILE_SIZE']:
+            raise BadRequest(f"File too large. Maximum size: {app.config['MAX_FILE_SIZE']} bytes")
+        
         # Validate request
         if 'audio' not in request.files:
             raise BadRequest("No audio file provided in request")
@@ -113,17 +314,10 @@ def predict_respiratory_disease() -> Dict[str, Any]:
         if not validate_audio_file(file):
             raise BadRequest("Invalid audio file format. Please upload WAV, MP3, or FLAC files.")
         
-        # Create temporary file
-        temp_dir = app.config['TEMP_DIR']
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = os.path.splitext(secure_filename(file.filename))[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        temp_file_path = os.path.join(temp_dir, unique_filename)
-        
-        # Save uploaded file
-        file.save(temp_file_path)
+        # Save uploaded file (anonymous inode on Linux when libsndfile can decode it, named file otherwise)
+        safe_filename = secure_filename(file.filename)
+        file_extension = os.path.splitext(safe_filename)[1]
+        temp_file_path, temp_fd = spool_upload(file, app.config['TEMP_DIR'], file_extension)
         logger.info(f"Saved uploaded file to: {temp_file_path}")
         
         # Validate file size
@@ -131,12 +325,16 @@ def predict_respiratory_disease() -> Dict[str, Any]:
         if file_size > app.config['MAX_FILE_SIZE']:
             raise BadRequest(f"File too large. Maximum size: {app.config['MAX_FILE_SIZE']} bytes")
         
-        # Get model path
-        model_path = os.path.join(app.config['MODEL_DIR'], 'respiratory_classifier.pkl')
-        
         # Make prediction
+        from pipeline import predict_respiratory_condition
+        
         logger.info("Starting prediction process...")
-        prediction_result = predict_respiratory_condition(temp_file_path, model_path)
+        prediction_result = predict_respiratory_condition(
+            temp_file_path,
+            app.config['MODEL_PATH'],
+            model=get_model(),
+            preprocessing_pipeline=get_preprocessing_pipeline()
+        )
         
         # Generate AI insights if enabled
         ai_insights = None
@@ -159,11 +357,11 @@ def predict_respiratory_disease() -> Dict[str, Any]:
                 confidence=float(prediction_result['probability']),
                 all_probabilities=prediction_result['all_probabilities'],
                 prediction_code=int(prediction_result['prediction_code']),
-                timestamp=datetime.utcnow().isoformat(),
+                timestamp=g.timestamp,
                 file_info={
-                    "original_filename": secure_filename(file.filename),
+                    "original_filename": safe_filename,
                     "file_size": file_size,
-                    "processing_time_ms": 0  # Will be calculated later
+                    "processing_time_ms": (time.perf_counter_ns() - g.start_ns) // 1_000_000
                 },
                 ai_insights=ai_insights
             )
@@ -174,25 +372,25 @@ def predict_respiratory_disease() -> Dict[str, Any]:
                 confidence=float(prediction_result['probability']),
                 all_probabilities=prediction_result['all_probabilities'],
                 prediction_code=int(prediction_result['prediction_code']),
-                timestamp=datetime.utcnow().isoformat(),
+                timestamp=g.timestamp,
                 file_info={
-                    "original_filename": secure_filename(file.filename),
+                    "original_filename": safe_filename,
                     "file_size": file_size,
-                    "processing_time_ms": 0  # Will be calculated later
+                    "processing_time_ms": (time.perf_counter_ns() - g.start_ns) // 1_000_000
                 }
             )
         
         logger.info(f"Prediction completed: {prediction_result['prediction']} "
                    f"(confidence: {prediction_result['probability']:.2%})")
         
-        return jsonify(response.dict()), 200
+        return json_response(response.model_dump()), 200
         
     except BadRequest as e:
         logger.warning(f"Bad request: {str(e)}")
         return jsonify({
             "error": "Invalid request",
             "message": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         }), 400
         
     except FileNotFoundError as e:
@@ -200,7 +398,7 @@ def predict_respiratory_disease() -> Dict[str, Any]:
         return jsonify({
             "error": "Model not available",
             "message": "Prediction model not found. Please contact system administrator.",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         }), 503
         
     except Exception as e:
@@ -208,12 +406,15 @@ def predict_respiratory_disease() -> Dict[str, Any]:
         return jsonify({
             "error": "Prediction failed",
             "message": "An error occurred during prediction. Please try again.",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         }), 500
         
     finally:
         # Cleanup temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
+        if temp_fd is not None:
+            # Closing the last descriptor frees the O_TMPFILE inode
+            os.close(temp_fd)
+        elif temp_file_path and os.path.exists(temp_file_path):
             try:
                 os.remove(temp_file_path)
                 logger.debug(f"Cleaned up temporary file: {temp_file_path}")
@@ -230,68 +431,13 @@ def get_disease_info() -> Dict[str, Any]:
         Dict[str, Any]: List of diseases with descriptions and symptoms
     """
     try:
-        diseases = [
-            {
-                "name": "Asthma",
-                "description": "A respiratory condition where airways narrow and swell, producing extra mucus.",
-                "symptoms": ["Shortness of breath", "Chest tightness", "Wheezing", "Coughing"],
-                "severity": "Moderate"
-            },
-            {
-                "name": "Bronchiectasis", 
-                "description": "A condition where the bronchi are abnormally widened and thickened.",
-                "symptoms": ["Persistent cough", "Daily sputum production", "Shortness of breath"],
-                "severity": "Severe"
-            },
-            {
-                "name": "Bronchiolitis",
-                "description": "Inflammation of the small airways in the lungs.",
-                "symptoms": ["Cough", "Wheezing", "Shortness of breath", "Fever"],
-                "severity": "Mild to Moderate"
-            },
-            {
-                "name": "COPD",
-                "description": "Chronic Obstructive Pulmonary Disease - progressive lung disease.",
-                "symptoms": ["Chronic cough", "Shortness of breath", "Excessive mucus"],
-                "severity": "Severe"
-            },
-            {
-                "name": "Healthy",
-                "description": "Normal respiratory function with no detected abnormalities.",
-                "symptoms": ["None"],
-                "severity": "None"
-            },
-            {
-                "name": "LRTI",
-                "description": "Lower Respiratory Tract Infection affecting lungs and airways.",
-                "symptoms": ["Productive cough", "Fever", "Shortness of breath"],
-                "severity": "Moderate"
-            },
-            {
-                "name": "Pneumonia",
-                "description": "Infection that inflames air sacs in one or both lungs.",
-                "symptoms": ["Cough with phlegm", "Fever", "Chills", "Difficulty breathing"],
-                "severity": "Severe"
-            },
-            {
-                "name": "URTI",
-                "description": "Upper Respiratory Tract Infection affecting nose, throat, and sinuses.",
-                "symptoms": ["Runny nose", "Sore throat", "Cough", "Sneezing"],
-                "severity": "Mild"
-            }
-        ]
-        
-        return jsonify({
-            "diseases": diseases,
-            "total_count": len(diseases),
-            "timestamp": datetime.utcnow().isoformat()
-        }), 200
+        return _static_json_response(_DISEASES_PAYLOAD), 200
         
     except Exception as e:
         logger.error(f"Failed to get disease info: {str(e)}")
         return jsonify({
             "error": "Failed to retrieve disease information",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         }), 500
 
 
@@ -304,26 +450,16 @@ def get_pipeline_status() -> Dict[str, Any]:
         Dict[str, Any]: Pipeline status and configuration
     """
     try:
-        pipeline = get_preprocessing_pipeline()
+        # Raises rather than returning None, so the loaded payload is always accurate
+        get_preprocessing_pipeline()
         
-        return jsonify({
-            "pipeline_loaded": pipeline is not None,
-            "target_duration": 7.8560090702947845,
-            "excluded_features": ['mel_spectrogram_min', 'chroma_stft_max'],
-            "steps": [
-                "AudioLoader",
-                "AudioTrimmer", 
-                "FeatureExtractor",
-                "FeatureStatisticsCalculator"
-            ],
-            "timestamp": datetime.utcnow().isoformat()
-        }), 200
+        return _static_json_response(_PIPELINE_STATUS_PAYLOAD), 200
         
     except Exception as e:
         logger.error(f"Failed to get pipeline status: {str(e)}")
         return jsonify({
             "error": "Failed to retrieve pipeline status",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": g.timestamp
         }), 500
 
 
@@ -333,7 +469,7 @@ def not_found(error) -> Dict[str, Any]:
     return jsonify({
         "error": "Not found",
         "message": "The requested endpoint does not exist",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": g.timestamp
     }), 404
 
 
@@ -343,7 +479,7 @@ def method_not_allowed(error) -> Dict[str, Any]:
     return jsonify({
         "error": "Method not allowed",
         "message": "The requested method is not allowed for this endpoint",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": g.timestamp
     }), 405
 
 
@@ -354,17 +490,13 @@ def internal_error(error) -> Dict[str, Any]:
     return jsonify({
         "error": "Internal server error",
         "message": "An unexpected error occurred",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": g.timestamp
     }), 500
 
 
 if __name__ == '__main__':
-    # Initialize pipeline on startup
-    try:
-        get_preprocessing_pipeline()
-        logger.info("Preprocessing pipeline initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize pipeline: {str(e)}")
+    # Initialize pipeline and model while the server binds
+    start_warm_up()
     
     # Run the application
     app.run(
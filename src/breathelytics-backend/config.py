@@ -5,8 +5,9 @@ Provides environment-specific configuration for development, testing, and produc
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 
 
 class Config:
@@ -20,16 +21,20 @@ class Config:
     HOST: str = os.environ.get('FLASK_HOST') or '0.0.0.0'
     PORT: int = int(os.environ.get('FLASK_PORT') or 5000)
     DEBUG: bool = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+    SERVER_THREADS: int = int(os.environ.get('SERVER_THREADS') or 8)  # waitress worker threads
     
     # File handling settings
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB in bytes
-    ALLOWED_EXTENSIONS: List[str] = ['wav', 'mp3', 'flac', 'm4a']
+    ALLOWED_EXTENSIONS: FrozenSet[str] = frozenset({'wav', 'mp3', 'flac', 'm4a'})
     
     # Directory settings
     BASE_DIR: Path = Path(__file__).parent
     MODEL_DIR: str = str(BASE_DIR)
+    MODEL_PATH: str = os.path.join(MODEL_DIR, 'respiratory_classifier.pkl')
     TEMP_DIR: str = os.environ.get('TEMP_DIR') or str(BASE_DIR / 'temp')
     LOGS_DIR: str = os.environ.get('LOGS_DIR') or str(BASE_DIR / 'logs')
+    # Numba JIT cache; kept outside the source tree so compiled binaries never land in git
+    CACHE_DIR: str = os.environ.get('CACHE_DIR') or str(Path.home() / '.cache' / 'breathelytics')
     
     # ML Pipeline settings
     TARGET_DURATION: float = 7.8560090702947845  # seconds
@@ -47,18 +52,19 @@ class Config:
     ENABLE_LLM: bool = os.environ.get('ENABLE_LLM', 'True').lower() == 'true'
     
     # CORS settings
-    CORS_ORIGINS: List[str] = [
+    CORS_ORIGINS: FrozenSet[str] = frozenset({
         "http://localhost:8080",
-        "http://localhost:3000", 
+        "http://localhost:3000",
         "http://127.0.0.1:8080",
         "http://127.0.0.1:3000"
-    ]
+    })
     
     @classmethod
     def init_directories(cls) -> None:
         """Create necessary directories if they don't exist."""
         os.makedirs(cls.TEMP_DIR, exist_ok=True)
         os.makedirs(cls.LOGS_DIR, exist_ok=True)
+        os.makedirs(cls.CACHE_DIR, exist_ok=True)
 
 
 class DevelopmentConfig(Config):
@@ -101,10 +107,14 @@ config_map = {
 }
 
 
+@lru_cache(maxsize=None)
 def get_config(config_name: Optional[str] = None) -> Config:
     """
     Get configuration class based on environment.
     
+    The instance is cached per ``config_name``, so environment variables are
+    read and directories created only on the first call.
+    
     Args:
         config_name: Configuration name ('development', 'testing', 'production')
         
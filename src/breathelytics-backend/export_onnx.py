@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Export the pickled respiratory classifier to ONNX.
+
+Writes respiratory_classifier.onnx next to the pickle; the API serves it through
+onnxruntime when its recorded pickle hash matches (see pipeline.load_classifier).
+Re-run after retraining.
+
+Requires: skl2onnx (export time only)
+"""
+
+import os
+import sys
+
+import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+from config import Config
+from pipeline import model_sha256
+
+
+def export(model_path: str = Config.MODEL_PATH) -> str:
+    """
+    Convert the pickled model and save it alongside.
+    
+    Args:
+        model_path: Path to the pickled sklearn classifier
+        
+    Returns:
+        str: Path of the written .onnx file
+    """
+    model = joblib.load(model_path)
+    
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[('X', FloatTensorType([None, model.n_features_in_]))],
+        options={id(model): {'zipmap': False}},  # plain probability tensor
+        target_opset={'': 17, 'ai.onnx.ml': 3}
+    )
+    
+    # load_classifier needs the class codes, the training column order and
+    # the pickle's hash, which it checks before serving this export
+    metadata = {
+        'classes': ','.join(str(int(c)) for c in model.classes_),
+        'feature_names': ','.join(model.feature_names_in_),
+        'source_sha256': model_sha256(model_path)
+    }
+    for key, value in metadata.items():
+        entry = onnx_model.metadata_props.add()
+        entry.key = key
+        entry.value = value
+    
+    onnx_path = os.path.splitext(model_path)[0] + '.onnx'
+    with open(onnx_path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    
+    print(f"Exported {model_path} -> {onnx_path}")
+    return onnx_path
+
+
+if __name__ == '__main__':
+    export(*sys.argv[1:2])
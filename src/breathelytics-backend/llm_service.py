@@ -6,100 +6,42 @@ of respiratory disease predictions from the ML model.
 """
 
 import os
+import copy
+import re
 import json
 import logging
-import requests
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from operator import itemgetter
+from types import MappingProxyType
 from typing import Dict, Any, Optional
-from datetime import datetime
+
+# orjson decodes Gemini's JSON several times faster; its JSONDecodeError
+# subclasses json.JSONDecodeError, so error handling is the same either way
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger('breathelytics')
 
+# Read once at import; the environment doesn't change after startup
+_GEMINI_API_KEY: Optional[str] = os.environ.get('GEMINI_API_KEY')
 
-class GeminiLLMService:
-    """Service class for Google Gemini LLM integration."""
-    
-    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
-        """
-        Initialize Gemini LLM service.
-        
-        Args:
-            api_key: Google AI API key
-            model_name: Gemini model name to use
-        """
-        self.api_key = api_key
-        self.model_name = model_name
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
-        self.timeout = 30
-        self.max_retries = 3
-        
-        # Disease information mapping
-        self.disease_info = {
-            "Asthma": {
-                "description": "condition where airways narrow and swell, producing extra mucus",
-                "severity": "Moderate",
-                "urgency": "moderate"
-            },
-            "Bronchiectasis": {
-                "description": "condition where bronchi are abnormally widened and thickened",
-                "severity": "Severe", 
-                "urgency": "high"
-            },
-            "Bronchiolitis": {
-                "description": "inflammation of the small airways in the lungs",
-                "severity": "Mild to Moderate",
-                "urgency": "moderate"
-            },
-            "COPD": {
-                "description": "chronic obstructive pulmonary disease that is progressive",
-                "severity": "Severe",
-                "urgency": "high"
-            },
-            "Healthy": {
-                "description": "normal respiratory function with no detected abnormalities",
-                "severity": "Normal",
-                "urgency": "low"
-            },
-            "LRTI": {
-                "description": "lower respiratory tract infection affecting lungs and airways",
-                "severity": "Moderate",
-                "urgency": "moderate"
-            },
-            "Pneumonia": {
-                "description": "infection that inflames air sacs in one or both lungs",
-                "severity": "Severe",
-                "urgency": "high"
-            },
-            "URTI": {
-                "description": "upper respiratory tract infection affecting nose, throat, and sinuses",
-                "severity": "Mild",
-                "urgency": "low"
-            }
-        }
-    
-    def _build_prompt(self, prediction_result: Dict[str, Any]) -> str:
-        """
-        Build the prompt for Gemini based on ML prediction results.
-        
-        Args:
-            prediction_result: ML prediction output
-            
-        Returns:
-            str: Formatted prompt for Gemini
-        """
-        prediction = prediction_result['prediction']
-        probability = prediction_result['probability']
-        all_probs = prediction_result['all_probabilities']
-        
-        # Build probability distribution text
-        prob_lines = []
-        for condition, prob in sorted(all_probs.items(), key=lambda x: x[1], reverse=True):
-            prob_lines.append(f"- {condition}: {prob:.0%}")
-        
-        prob_text = "\n".join(prob_lines)
-        
-        prompt = f"""As a professional AI Medical Assistant, analyze the following prediction results:
+# requests is imported lazily with the first session and kept here afterwards
+_requests = None
 
-The patient shows a high likelihood of having {prediction} ({probability:.0%}). Here are the other potential conditions based on the patient's respiratory sounds:
+
+# Opening (optionally ```json) and closing markdown fences around Gemini's JSON
+_FENCE_RE = re.compile(r'^```(?:json)?|```$')
+
+# Static prompt body, formatted per request; literal JSON braces are doubled
+_PROMPT_TEMPLATE = """As a professional AI Medical Assistant, analyze the following prediction results:
+
+The patient shows a high likelihood of having {prediction} ({probability_pct}). Here are the other potential conditions based on the patient's respiratory sounds:
 
 {prob_text}
 
@@ -109,7 +51,7 @@ Provide your response in valid JSON format with the following structure:
 {{
     "summary": "Easy-to-understand summary of results",
     "condition_explanation": "Explanation of {prediction} condition in layman's terms",
-    "confidence_interpretation": "Interpretation of {probability:.0%} confidence level",
+    "confidence_interpretation": "Interpretation of {probability_pct} confidence level",
     "insights": [
         "Key insight based on probabilities",
         "Analysis of respiratory sound patterns",
@@ -133,7 +75,168 @@ IMPORTANT:
 - Provide reassuring yet accurate information
 - Ensure output is valid JSON"""
 
-        return prompt
+
+# Disease information mapping, shared read-only by all service instances
+_DISEASE_INFO = MappingProxyType({
+    "Asthma": {
+        "description": "condition where airways narrow and swell, producing extra mucus",
+        "severity": "Moderate",
+        "urgency": "moderate"
+    },
+    "Bronchiectasis": {
+        "description": "condition where bronchi are abnormally widened and thickened",
+        "severity": "Severe", 
+        "urgency": "high"
+    },
+    "Bronchiolitis": {
+        "description": "inflammation of the small airways in the lungs",
+        "severity": "Mild to Moderate",
+        "urgency": "moderate"
+    },
+    "COPD": {
+        "description": "chronic obstructive pulmonary disease that is progressive",
+        "severity": "Severe",
+        "urgency": "high"
+    },
+    "Healthy": {
+        "description": "normal respiratory function with no detected abnormalities",
+        "severity": "Normal",
+        "urgency": "low"
+    },
+    "LRTI": {
+        "description": "lower respiratory tract infection affecting lungs and airways",
+        "severity": "Moderate",
+        "urgency": "moderate"
+    },
+    "Pneumonia": {
+        "description": "infection that inflames air sacs in one or both lungs",
+        "severity": "Severe",
+        "urgency": "high"
+    },
+    "URTI": {
+        "description": "upper respiratory tract infection affecting nose, throat, and sinuses",
+        "severity": "Mild",
+        "urgency": "low"
+    }
+})
+
+
+# Fallback confidence wording: <= 0.5 weak, <= 0.7 moderate, above that strong
+_CONFIDENCE_THRESHOLDS = (0.5, 0.7)
+_CONFIDENCE_LABELS = ('weak indication', 'moderate possibility', 'strong indication')
+
+# Generic recommendations served when Gemini is unavailable; callers get list copies
+_FALLBACK_RECOMMENDATIONS = MappingProxyType({
+    "immediate": (
+        "Consult with a doctor for further evaluation",
+        "Document any symptoms you are currently experiencing"
+    ),
+    "monitoring": (
+        "Watch for changes in breathing patterns",
+        "Monitor symptoms such as shortness of breath or coughing"
+    ),
+    "lifestyle": (
+        "Avoid cigarette smoke and air pollutants",
+        "Maintain good hand hygiene and clean environment"
+    ),
+    "medical": (
+        "See a doctor immediately if symptoms worsen",
+        "Undergo routine examinations as recommended by medical professionals"
+    )
+})
+
+
+class GeminiLLMService:
+    """Service class for Google Gemini LLM integration."""
+    
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+        """
+        Initialize Gemini LLM service.
+        
+        Args:
+            api_key: Google AI API key
+            model_name: Gemini model name to use
+        """
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self.timeout = 30
+        self.max_retries = 3
+        
+        # Resolved once; the key goes in query params instead of a concatenated URL
+        self.url = f"{self.base_url}/{self.model_name}:generateContent"
+        self.params = {"key": self.api_key}
+        self.headers = {"Content-Type": "application/json"}
+        
+        # Pooled HTTP session, created on first Gemini call so that importing
+        # this module doesn't pull in requests/urllib3 (see _get_session)
+        self._session = None
+        self._session_lock = threading.Lock()
+        
+        # LRU of parsed insights keyed by prompt text. The prompt only carries
+        # whole-percent probabilities, so re-uploads of the same recording (or
+        # near-identical predictions) skip the Gemini round trip entirely.
+        self.cache_size = 256
+        self._insight_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _build_prompt(self, prediction_result: Dict[str, Any]) -> str:
+        """
+        Build the prompt for Gemini based on ML prediction results.
+        
+        Args:
+            prediction_result: ML prediction output
+            
+        Returns:
+            str: Formatted prompt for Gemini
+        """
+        prob_text = "\n".join(
+            f"- {condition}: {prob:.0%}"
+            for condition, prob in sorted(
+                prediction_result['all_probabilities'].items(), key=itemgetter(1), reverse=True
+            )
+        )
+        
+        return _PROMPT_TEMPLATE.format(
+            prediction=prediction_result['prediction'],
+            probability_pct=f"{prediction_result['probability']:.0%}",
+            prob_text=prob_text
+        )
+    
+    def _get_session(self):
+        """
+        Return the pooled HTTP session, creating it on first use.
+        
+        The session keeps the TLS connection to Gemini alive between insight calls.
+        Only transient statuses are retried (with backoff, honoring Retry-After);
+        4xx validation/auth errors come straight back so the fallback is served sooner.
+        
+        Returns:
+            requests.Session: Shared session for Gemini calls
+        """
+        global _requests
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util import Retry
+                    
+                    # Retry counts retries, not attempts: max_retries - 1 keeps the
+                    # original budget of max_retries POSTs in total
+                    retry = Retry(
+                        total=max(self.max_retries - 1, 0),
+                        backoff_factor=0.5,
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=frozenset(['POST']),
+                        respect_retry_after_header=True,
+                        raise_on_status=False
+                    )
+                    session = requests.Session()
+                    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+                    _requests = requests
+                    self._session = session
+        return self._session
     
     def _call_gemini_api(self, prompt: str) -> Dict[str, Any]:
         """
@@ -148,12 +251,6 @@ IMPORTANT:
         Raises:
             Exception: If API call fails
         """
-        url = f"{self.base_url}/{self.model_name}:generateContent"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "contents": [{
                 "parts": [{
@@ -168,37 +265,26 @@ IMPORTANT:
             }
         }
         
-        # Add API key to URL
-        url_with_key = f"{url}?key={self.api_key}"
+        session = self._get_session()
+        try:
+            logger.info("Calling Gemini API")
+            response = session.post(
+                self.url,
+                params=self.params,
+                headers=self.headers,
+                json=payload,
+                timeout=self.timeout
+            )
+        except _requests.exceptions.Timeout:
+            raise Exception("Gemini API timeout")
+        except _requests.exceptions.RequestException as e:
+            raise Exception(f"Gemini API failed: {str(e)}")
         
-        for attempt in range(self.max_retries):
-            try:
-                logger.info(f"Calling Gemini API (attempt {attempt + 1})")
-                response = requests.post(
-                    url_with_key,
-                    headers=headers,
-                    json=payload,
-                    timeout=self.timeout
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.warning(f"Gemini API returned status {response.status_code}: {response.text}")
-                    if attempt == self.max_retries - 1:
-                        raise Exception(f"Gemini API failed with status {response.status_code}")
-                    
-            except requests.exceptions.Timeout:
-                logger.warning(f"Gemini API timeout (attempt {attempt + 1})")
-                if attempt == self.max_retries - 1:
-                    raise Exception("Gemini API timeout after multiple attempts")
-                    
-            except Exception as e:
-                logger.error(f"Gemini API error (attempt {attempt + 1}): {str(e)}")
-                if attempt == self.max_retries - 1:
-                    raise Exception(f"Gemini API failed: {str(e)}")
+        if response.status_code >= 400:
+            logger.warning(f"Gemini API returned status {response.status_code}: {response.text}")
+            raise Exception(f"Gemini API failed with status {response.status_code}")
         
-        raise Exception("Gemini API failed after all retries")
+        return _json_loads(response.content)
     
     def _parse_gemini_response(self, gemini_response: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -229,18 +315,10 @@ IMPORTANT:
             
             # Try to extract JSON from response
             # Sometimes Gemini wraps JSON in markdown code blocks
-            text_response = text_response.strip()
-            if text_response.startswith('```json'):
-                text_response = text_response[7:]
-            if text_response.endswith('```'):
-                text_response = text_response[:-3]
-            if text_response.startswith('```'):
-                text_response = text_response[3:]
-            
-            text_response = text_response.strip()
+            text_response = _FENCE_RE.sub('', text_response.strip()).strip()
             
             # Parse JSON
-            parsed_insights = json.loads(text_response)
+            parsed_insights = _json_loads(text_response)
             
             # Validate required fields
             required_fields = ['summary', 'condition_explanation', 'insights', 'recommendations']
@@ -281,7 +359,7 @@ IMPORTANT:
         prediction = prediction_result['prediction']
         probability = prediction_result['probability']
         
-        disease_details = self.disease_info.get(prediction, {
+        disease_details = _DISEASE_INFO.get(prediction, {
             "description": "respiratory condition detected by the system",
             "severity": "Requires evaluation",
             "urgency": "moderate"
@@ -297,33 +375,17 @@ IMPORTANT:
         else:
             risk_level = "LOW"
         
+        pct = f"{probability:.0%}"
         return {
-            "summary": f"Analysis indicates possible {prediction} with {probability:.0%} confidence level",
+            "summary": f"Analysis indicates possible {prediction} with {pct} confidence level",
             "condition_explanation": f"{prediction} is {disease_details['description']}",
-            "confidence_interpretation": f"Confidence level of {probability:.0%} indicates {'strong indication' if probability > 0.7 else 'moderate possibility' if probability > 0.5 else 'weak indication'}",
+            "confidence_interpretation": f"Confidence level of {pct} indicates {_CONFIDENCE_LABELS[bisect_left(_CONFIDENCE_THRESHOLDS, probability)]}",
             "insights": [
                 f"System detected sound patterns consistent with {prediction}",
-                f"Confidence level of {probability:.0%} based on audio feature analysis",
+                f"Confidence level of {pct} based on audio feature analysis",
                 "This result serves as initial screening, not a definitive medical diagnosis"
             ],
-            "recommendations": {
-                "immediate": [
-                    "Consult with a doctor for further evaluation",
-                    "Document any symptoms you are currently experiencing"
-                ],
-                "monitoring": [
-                    "Watch for changes in breathing patterns",
-                    "Monitor symptoms such as shortness of breath or coughing"
-                ],
-                "lifestyle": [
-                    "Avoid cigarette smoke and air pollutants",
-                    "Maintain good hand hygiene and clean environment"
-                ],
-                "medical": [
-                    "See a doctor immediately if symptoms worsen",
-                    "Undergo routine examinations as recommended by medical professionals"
-                ]
-            },
+            "recommendations": {k: list(v) for k, v in _FALLBACK_RECOMMENDATIONS.items()},
             "risk_level": risk_level,
             "next_steps": "Consult with medical professionals for accurate diagnosis",
             "disclaimer": "This result is an initial screening using AI. Medical consultation is still required for proper diagnosis and treatment.",
@@ -340,7 +402,7 @@ IMPORTANT:
         Returns:
             Dict: Medical insights and recommendations
         """
-        start_time = datetime.now()
+        start_time = time.monotonic()
         
         try:
             # Validate input
@@ -353,15 +415,29 @@ IMPORTANT:
             prompt = self._build_prompt(prediction_result)
             logger.info(f"Generated prompt for condition: {prediction_result['prediction']}")
             
-            # Call Gemini API
-            gemini_response = self._call_gemini_api(prompt)
+            with self._cache_lock:
+                cached = self._insight_cache.get(prompt)
+                if cached is not None:
+                    self._insight_cache.move_to_end(prompt)
             
-            # Parse response
-            insights = self._parse_gemini_response(gemini_response)
+            if cached is not None:
+                insights = copy.deepcopy(cached)
+                logger.info(f"Using cached insights for {prediction_result['prediction']}")
+            else:
+                # Call Gemini API
+                gemini_response = self._call_gemini_api(prompt)
+                
+                # Parse response
+                insights = self._parse_gemini_response(gemini_response)
+                
+                with self._cache_lock:
+                    self._insight_cache[prompt] = copy.deepcopy(insights)
+                    if len(self._insight_cache) > self.cache_size:
+                        self._insight_cache.popitem(last=False)
             
             # Add metadata
             insights['llm_status'] = 'success'
-            insights['processing_time_ms'] = int((datetime.now() - start_time).total_seconds() * 1000)
+            insights['processing_time_ms'] = int((time.monotonic() - start_time) * 1000)
             
             logger.info(f"Generated insights successfully for {prediction_result['prediction']}")
             return insights
@@ -371,7 +447,7 @@ IMPORTANT:
             
             # Return fallback insights
             fallback_insights = self._generate_fallback_insights(prediction_result)
-            fallback_insights['processing_time_ms'] = int((datetime.now() - start_time).total_seconds() * 1000)
+            fallback_insights['processing_time_ms'] = int((time.monotonic() - start_time) * 1000)
             fallback_insights['error_message'] = str(e)
             
             logger.info(f"Returned fallback insights for {prediction_result['prediction']}")
@@ -387,10 +463,9 @@ def get_llm_service() -> Optional[GeminiLLMService]:
     global _llm_service
     
     if _llm_service is None:
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if api_key:
+        if _GEMINI_API_KEY:
             try:
-                _llm_service = GeminiLLMService(api_key)
+                _llm_service = GeminiLLMService(_GEMINI_API_KEY)
                 logger.info("LLM service initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize LLM service: {str(e)}")
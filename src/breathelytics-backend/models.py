@@ -6,28 +6,36 @@ Defines data models for API requests, responses, and internal data structures.
 
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from config import Config
 
 
 class PredictionRequest(BaseModel):
     """Model for prediction request data."""
     
-    file_data: bytes = Field(..., description="Audio file binary data")
+    # Holds the upload's stream (e.g. Werkzeug's SpooledTemporaryFile) rather than
+    # its bytes, so validation never copies the whole recording into memory
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    file_data: Any = Field(..., description="Readable stream of the uploaded audio")
     filename: str = Field(..., description="Original filename")
-    file_size: int = Field(..., gt=0, description="File size in bytes")
     
-    @validator('filename')
+    @field_validator('filename')
+    @classmethod
     def validate_filename(cls, v: str) -> str:
         """Validate filename has proper extension."""
-        allowed_extensions = ['.wav', '.mp3', '.flac', '.m4a']
-        if not any(v.lower().endswith(ext) for ext in allowed_extensions):
-            raise ValueError(f"File must have one of these extensions: {allowed_extensions}")
+        if '.' not in v or v.rsplit('.', 1)[-1].lower() not in Config.ALLOWED_EXTENSIONS:
+            raise ValueError(f"File must have one of these extensions: {sorted(Config.ALLOWED_EXTENSIONS)}")
         return v
 
 
 class PredictionResponse(BaseModel):
     """Model for prediction response data."""
     
+    # Built once per request and only serialized; frozen skips assignment tracking
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     prediction: str = Field(..., description="Predicted respiratory condition")
     confidence: float = Field(..., ge=0.0, le=1.0, description="Prediction confidence score")
     prediction_code: int = Field(..., ge=0, description="Numeric prediction code")
@@ -35,7 +43,8 @@ class PredictionResponse(BaseModel):
     timestamp: str = Field(..., description="Prediction timestamp in ISO format")
     file_info: Dict[str, Any] = Field(..., description="Information about processed file")
     
-    @validator('all_probabilities')
+    @field_validator('all_probabilities')
+    @classmethod
     def validate_probabilities(cls, v: Dict[str, float]) -> Dict[str, float]:
         """Validate that all probabilities are between 0 and 1."""
         for condition, prob in v.items():
@@ -93,6 +102,9 @@ class ErrorResponse(BaseModel):
 class AudioFeatures(BaseModel):
     """Model for extracted audio features."""
     
+    # Fixed 32-field DTO, never mutated after extraction
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     chroma_stft_mean: float = Field(..., description="Chroma STFT mean")
     chroma_stft_std: float = Field(..., description="Chroma STFT standard deviation")
     chroma_stft_min: float = Field(..., description="Chroma STFT minimum")
@@ -147,6 +159,9 @@ class ProcessingMetrics(BaseModel):
 class AIInsightResponse(BaseModel):
     """Model for AI-generated medical insights."""
     
+    # Extra keys from Gemini (or the fallback's error_message) are ignored, not rejected
+    model_config = ConfigDict(frozen=True)
+    
     summary: str = Field(..., description="Brief summary of the analysis")
     condition_explanation: str = Field(..., description="Explanation of the detected condition")
     confidence_interpretation: str = Field(..., description="Interpretation of confidence level")
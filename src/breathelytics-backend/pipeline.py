@@ -5,20 +5,59 @@ Enhanced ML pipeline for preprocessing respiratory audio and predicting diseases
 Includes comprehensive feature extraction and statistical analysis.
 """
 
+import hashlib
 import os
 import time
-from typing import Dict, Any, List, Optional, Union, Tuple
+import warnings
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Sequence, Union, Tuple
 import numpy as np
-import pandas as pd
 import librosa
+import soundfile as sf
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
 import joblib
+from joblib import Parallel, delayed
 import logging
 
 logger = logging.getLogger('breathelytics')
 
 
+@dataclass
+class AudioClip:
+    """Decoded audio for one file, passed between the pipeline's audio stages."""
+    
+    data: np.ndarray
+    sample_rate: int
+    duration: float
+    original_path: Optional[str] = None
+    original_duration: Optional[float] = None
+
+
+def _map_files(func: Callable[[Any], Any], items: Sequence[Any], n_jobs: Optional[int]) -> List[Any]:
+    """
+    Apply a per-file function, fanning out to worker processes for batches.
+    
+    A single file (the API's case) always runs in-process; process start-up would
+    dominate. joblib's loky workers cap BLAS/OpenMP threads so the pool doesn't
+    oversubscribe the CPU, and waveforms over 1 MB reach them as read-only
+    memmaps instead of pickled copies.
+    
+    Args:
+        func: Per-file function
+        items: Per-file inputs
+        n_jobs: Worker count, as in scikit-learn (None/1 means sequential)
+        
+    Returns:
+        List of results in input order
+    """
+    if n_jobs in (None, 1) or len(items) < 2:
+        return [func(item) for item in items]
+    parallel = Parallel(n_jobs=n_jobs, backend='loky', batch_size='auto', max_nbytes='1M', mmap_mode='r')
+    return parallel(delayed(func)(item) for item in items)
+
+
 class AudioLoader(BaseEstimator, TransformerMixin):
     """
     Custom transformer to load audio files and extract basic properties.
@@ -26,22 +65,24 @@ class AudioLoader(BaseEstimator, TransformerMixin):
     Loads audio files using librosa and prepares them for further processing.
     """
     
-    def __init__(self, sample_rate: Optional[int] = None, mono: bool = True) -> None:
+    def __init__(self, sample_rate: Optional[int] = None, mono: bool = True, n_jobs: Optional[int] = None) -> None:
         """
         Initialize AudioLoader.
         
         Args:
             sample_rate: Target sample rate for audio loading
             mono: Whether to convert to mono audio
+            n_jobs: Worker processes for multi-file batches (None/1 loads sequentially)
         """
         self.sample_rate = sample_rate
         self.mono = mono
+        self.n_jobs = n_jobs
     
     def fit(self, X: Any, y: Optional[Any] = None) -> 'AudioLoader':
         """Fit method (no-op for transformers)."""
         return self
     
-    def transform(self, X: List[str]) -> Dict[str, Dict[str, Any]]:
+    def transform(self, X: List[str]) -> Dict[str, AudioClip]:
         """
         Load audio files from a list of file paths.
         
@@ -55,34 +96,66 @@ class AudioLoader(BaseEstimator, TransformerMixin):
             FileNotFoundError: If audio file doesn't exist
             ValueError: If audio file cannot be loaded
         """
-        result = {}
+        loaded = _map_files(self._load_one, X, self.n_jobs)
+        return {os.path.basename(file_path): info for file_path, info in zip(X, loaded)}
+    
+    def _read(self, file_path: str) -> Tuple[np.ndarray, int]:
+        """
+        Decode audio as float32, mono-mixed if requested.
         
-        for file_path in X:
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"Audio file not found: {file_path}")
+        Files libsndfile can decode at their native rate are read with soundfile
+        directly, skipping librosa.load's wrapper; resampling and formats it
+        can't open (e.g. M4A) go through librosa.load.
+        """
+        if self.sample_rate is None:
+            # Opening the file ourselves surfaces a missing file as FileNotFoundError
+            # (libsndfile would report a generic error) without a separate stat()
+            with open(file_path, 'rb') as f:
+                try:
+                    y, sr = sf.read(f, dtype='float32', always_2d=False)
+                except RuntimeError:  # soundfile.LibsndfileError on recent versions
+                    y = None
+            if y is not None:
+                if self.mono and y.ndim == 2:
+                    y = y.mean(axis=1)
+                return y, sr
+        
+        return librosa.load(file_path, sr=self.sample_rate, mono=self.mono)
+    
+    def _load_one(self, file_path: str) -> AudioClip:
+        """Load a single audio file and its basic properties."""
+        try:
+            filename = os.path.basename(file_path)
+            y, sr = self._read(file_path)
+            
+            logger.debug(f"Loaded audio file: {filename}, duration: {len(y) / sr:.2f}s")
+            
+            return AudioClip(data=y, sample_rate=sr, duration=len(y) / sr, original_path=file_path)
+            
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Audio file not found: {file_path}")
             
-            try:
-                filename = os.path.basename(file_path)
-                y, sr = librosa.load(
-                    file_path, 
-                    sr=self.sample_rate, 
-                    mono=self.mono
-                )
-                
-                result[filename] = {
-                    'data': y,
-                    'sample_rate': sr,
-                    'original_path': file_path,
-                    'duration': len(y) / sr
-                }
-                
-                logger.debug(f"Loaded audio file: {filename}, duration: {len(y) / sr:.2f}s")
-                
-            except Exception as e:
-                logger.error(f"Failed to load audio file {file_path}: {str(e)}")
-                raise ValueError(f"Cannot load audio file {file_path}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to load audio file {file_path}: {str(e)}")
+            raise ValueError(f"Cannot load audio file {file_path}: {str(e)}")
+
+
+@lru_cache(maxsize=32)
+def target_sample_count(target_duration: float, sample_rate: int) -> int:
+    """
+    Resolve a target duration to an integer sample count for a sample rate.
+    
+    Audio is loaded at its native rate, so the count can't be fixed at config
+    time; recordings share a handful of rates, so each pair is computed once.
+    
+    Args:
+        target_duration: Target duration in seconds
+        sample_rate: Sample rate of the loaded audio
         
-        return result
+    Returns:
+        int: Number of samples (truncated, matching the training pipeline)
+    """
+    return int(target_duration * sample_rate)
 
 
 class AudioTrimmer(BaseEstimator, TransformerMixin):
@@ -105,7 +178,7 @@ class AudioTrimmer(BaseEstimator, TransformerMixin):
         """Fit method (no-op for transformers)."""
         return self
     
-    def transform(self, X: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    def transform(self, X: Dict[str, AudioClip]) -> Dict[str, AudioClip]:
         """
         Trim audio files to consistent duration.
         
@@ -117,34 +190,49 @@ class AudioTrimmer(BaseEstimator, TransformerMixin):
         """
         trimmed = {}
         
-        for filename, audio_info in X.items():
-            sample_rate = audio_info['sample_rate']
-            target_samples = int(self.target_duration * sample_rate)
+        for filename, clip in X.items():
+            sample_rate = clip.sample_rate
+            target_samples = target_sample_count(self.target_duration, sample_rate)
             
             # Trim or pad audio to target length
-            if len(audio_info['data']) < target_samples:
-                # Pad with zeros if too short
-                trimmed_data = np.pad(
-                    audio_info['data'], 
-                    (0, target_samples - len(audio_info['data'])), 
-                    'constant'
-                )
-                logger.debug(f"Padded audio {filename} from {len(audio_info['data'])} to {target_samples} samples")
+            if len(clip.data) < target_samples:
+                # Pad with zeros if too short: one zeroed buffer and one copy
+                trimmed_data = np.zeros(target_samples, dtype=clip.data.dtype)
+                trimmed_data[:len(clip.data)] = clip.data
+                logger.debug(f"Padded audio {filename} from {len(clip.data)} to {target_samples} samples")
             else:
                 # Trim if too long
-                trimmed_data = audio_info['data'][:target_samples]
-                logger.debug(f"Trimmed audio {filename} from {len(audio_info['data'])} to {target_samples} samples")
+                trimmed_data = clip.data[:target_samples]
+                logger.debug(f"Trimmed audio {filename} from {len(clip.data)} to {target_samples} samples")
             
-            trimmed[filename] = {
-                'data': trimmed_data,
-                'sample_rate': sample_rate,
-                'duration': self.target_duration,
-                'original_duration': audio_info.get('duration', 0)
-            }
+            trimmed[filename] = AudioClip(
+                data=trimmed_data,
+                sample_rate=sample_rate,
+                duration=self.target_duration,
+                original_path=clip.original_path,
+                original_duration=clip.duration
+            )
         
         return trimmed
 
 
+# librosa's default FFT size, used for the shared STFT
+N_FFT = 2048
+
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int = 128) -> np.ndarray:
+    """
+    Build a mel filterbank once per (sample rate, FFT size, mel bands).
+    
+    librosa.feature.melspectrogram rebuilds this matrix on every call; the
+    cached copy is applied with the same einsum, so results are unchanged.
+    """
+    mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels)
+    mel_basis.flags.writeable = False
+    return mel_basis
+
+
 class FeatureExtractor(BaseEstimator, TransformerMixin):
     """
     Custom transformer to extract comprehensive audio features.
@@ -152,20 +240,41 @@ class FeatureExtractor(BaseEstimator, TransformerMixin):
     Extracts multiple types of audio features including spectral and temporal characteristics.
     """
     
-    def __init__(self, n_mfcc: int = 13) -> None:
+    def __init__(
+        self,
+        n_mfcc: int = 13,
+        n_fft: int = N_FFT,
+        hop_length: int = 512,
+        n_mels: int = 128,
+        n_bands: Optional[int] = None,
+        n_jobs: Optional[int] = None
+    ) -> None:
         """
         Initialize FeatureExtractor.
         
+        The defaults reproduce the features the shipped model was trained on;
+        smaller n_mels/n_bands are cheaper but need a retrained model.
+        
         Args:
             n_mfcc: Number of MFCC coefficients to extract
+            n_fft: FFT size of the shared STFT
+            hop_length: Samples between STFT frames
+            n_mels: Number of mel bands
+            n_bands: Spectral contrast bands (None derives a safe count from the sample rate)
+            n_jobs: Worker processes for multi-file batches (None/1 extracts sequentially)
         """
         self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.n_bands = n_bands
+        self.n_jobs = n_jobs
     
     def fit(self, X: Any, y: Optional[Any] = None) -> 'FeatureExtractor':
         """Fit method (no-op for transformers)."""
         return self
     
-    def transform(self, X: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, np.ndarray]]:
+    def transform(self, X: Dict[str, AudioClip]) -> Dict[str, Dict[str, np.ndarray]]:
         """
         Extract comprehensive audio features.
         
@@ -175,115 +284,166 @@ class FeatureExtractor(BaseEstimator, TransformerMixin):
         Returns:
             Dict containing extracted features for each audio file
         """
-        features = {}
+        extracted = _map_files(self._extract_one, list(X.items()), self.n_jobs)
+        return dict(zip(X, extracted))
+    
+    def _extract_one(self, item: Tuple[str, AudioClip]) -> Dict[str, np.ndarray]:
+        """Extract all features for a single (filename, clip) pair."""
+        filename, clip = item
+        y_audio = clip.data
+        sr = clip.sample_rate
         
-        for filename, audio_info in X.items():
-            y_audio = audio_info['data']
-            sr = audio_info['sample_rate']
+        try:
+            start_time = time.perf_counter()
+            
+            file_features = {}
+            
+            # One STFT shared by every spectral feature. Chroma and mel take the
+            # power spectrogram; centroid, bandwidth, rolloff and contrast take
+            # the magnitude (power=1).
+            magnitude = np.abs(librosa.stft(y_audio, n_fft=self.n_fft, hop_length=self.hop_length))
+            power = magnitude ** 2
+            
+            # Spectral features
+            file_features['chroma_stft'] = librosa.feature.chroma_stft(S=power, sr=sr)
+            mel = np.einsum("...ft,mf->...mt", power, _mel_filterbank(sr, self.n_fft, self.n_mels), optimize=True)
+            file_features['mfcc'] = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=self.n_mfcc)
+            file_features['mel_spectrogram'] = mel
+            
+            # Calculate safe parameters for spectral contrast based on sample rate
+            nyquist_freq = sr / 2
+            # Default fmin=200, n_bands=6, which creates 6 bands: 200-400, 400-800, etc.
+            # For 22050 Hz (nyquist=11025), we need max_freq = 200 * 2^(n_bands) < 11025
+            # 200 * 2^6 = 12800 > 11025, so we need to reduce n_bands or fmin
+            safe_fmin = min(200.0, nyquist_freq / 64)  # Ensure reasonable starting frequency
+            safe_n_bands = max(1, int(np.log2(nyquist_freq / safe_fmin)) - 1)  # Leave some margin
+            if self.n_bands is not None:
+                safe_n_bands = min(self.n_bands, safe_n_bands)
+            
+            file_features['spectral_contrast'] = librosa.feature.spectral_contrast(
+                S=magnitude, sr=sr, fmin=safe_fmin, n_bands=safe_n_bands
+            )
+            file_features['spectral_centroid'] = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+            file_features['spectral_bandwidth'] = librosa.feature.spectral_bandwidth(S=magnitude, sr=sr)
+            file_features['spectral_rolloff'] = librosa.feature.spectral_rolloff(S=magnitude, sr=sr)
+            
+            # Temporal features
+            file_features['zero_crossing_rate'] = librosa.feature.zero_crossing_rate(
+                y=y_audio, frame_length=self.n_fft, hop_length=self.hop_length
+            )
+            
+            extraction_time = time.perf_counter() - start_time
+            logger.debug(f"Feature extraction for {filename} completed in {extraction_time:.2f}s")
+            
+            return file_features
             
-            try:
-                start_time = time.time()
-                
-                file_features = {}
-                
-                # Spectral features
-                file_features['chroma_stft'] = librosa.feature.chroma_stft(y=y_audio, sr=sr)
-                file_features['mfcc'] = librosa.feature.mfcc(y=y_audio, sr=sr, n_mfcc=self.n_mfcc)
-                file_features['mel_spectrogram'] = librosa.feature.melspectrogram(y=y_audio, sr=sr)
-                
-                # Calculate safe parameters for spectral contrast based on sample rate
-                nyquist_freq = sr / 2
-                # Default fmin=200, n_bands=6, which creates 6 bands: 200-400, 400-800, etc.
-                # For 22050 Hz (nyquist=11025), we need max_freq = 200 * 2^(n_bands) < 11025
-                # 200 * 2^6 = 12800 > 11025, so we need to reduce n_bands or fmin
-                safe_fmin = min(200.0, nyquist_freq / 64)  # Ensure reasonable starting frequency
-                safe_n_bands = max(1, int(np.log2(nyquist_freq / safe_fmin)) - 1)  # Leave some margin
-                
-                file_features['spectral_contrast'] = librosa.feature.spectral_contrast(
-                    y=y_audio, sr=sr, fmin=safe_fmin, n_bands=safe_n_bands
-                )
-                file_features['spectral_centroid'] = librosa.feature.spectral_centroid(y=y_audio, sr=sr)
-                file_features['spectral_bandwidth'] = librosa.feature.spectral_bandwidth(y=y_audio, sr=sr)
-                file_features['spectral_rolloff'] = librosa.feature.spectral_rolloff(y=y_audio, sr=sr)
-                
-                # Temporal features
-                file_features['zero_crossing_rate'] = librosa.feature.zero_crossing_rate(y=y_audio)
-                
-                features[filename] = file_features
-                
-                extraction_time = time.time() - start_time
-                logger.debug(f"Feature extraction for {filename} completed in {extraction_time:.2f}s")
-                
-            except Exception as e:
-                logger.error(f"Feature extraction failed for {filename}: {str(e)}")
-                raise ValueError(f"Feature extraction failed for {filename}: {str(e)}")
-        
-        return features
+        except Exception as e:
+            logger.error(f"Feature extraction failed for {filename}: {str(e)}")
+            raise ValueError(f"Feature extraction failed for {filename}: {str(e)}")
+
+
+# Diagnoses in the order of the model's class codes 0..7
+DIAGNOSIS_LABELS = (
+    'Asthma', 'Bronchiectasis', 'Bronchiolitis', 'COPD',
+    'Healthy', 'LRTI', 'Pneumonia', 'URTI'
+)
+
+# Features produced by FeatureExtractor and per-feature statistics, in the
+# column order the model was trained on
+FEATURE_NAMES = (
+    'chroma_stft', 'mfcc', 'mel_spectrogram', 'spectral_contrast',
+    'spectral_centroid', 'spectral_bandwidth', 'spectral_rolloff', 'zero_crossing_rate'
+)
+_STATISTICS = ('mean', 'std', 'max', 'min')
+
+# NumPy 2.0+ lets std() reuse an already computed mean instead of taking it again
+_STD_ACCEPTS_MEAN = np.lib.NumpyVersion(np.__version__) >= '2.0.0'
+_ALL_COLUMNS = tuple(f'{name}_{stat}' for name in FEATURE_NAMES for stat in _STATISTICS)
 
 
 class FeatureStatisticsCalculator(BaseEstimator, TransformerMixin):
     """
     Custom transformer to calculate statistical measures of extracted features.
     
-    Computes mean, std, max, and min for each feature type.
+    Computes mean, std, max, and min for each feature type and returns them as a
+    plain (n_files, n_features) array; column names are in ``feature_columns_``.
     """
     
-    def __init__(self, excluded_features: Optional[List[str]] = None) -> None:
+    def __init__(
+        self,
+        excluded_features: Optional[List[str]] = None,
+        required_columns: Optional[List[str]] = None
+    ) -> None:
         """
         Initialize FeatureStatisticsCalculator.
         
         Args:
             excluded_features: List of feature names to exclude from final dataset
+            required_columns: Exact output columns, in order (e.g. a fitted model's
+                ``feature_names_in_``); overrides ``excluded_features``
         """
         self.excluded_features = excluded_features or []
+        self.required_columns = required_columns
+    
+    @property
+    def feature_columns_(self) -> List[str]:
+        """Names of the output columns, in order."""
+        if self.required_columns is not None:
+            return list(self.required_columns)
+        return [column for column in _ALL_COLUMNS if column not in self.excluded_features]
+    
+    def _reduction_plan(self) -> List[Tuple[str, List[Tuple[str, int]]]]:
+        """Group output columns by feature: (feature, [(statistic, output index), ...])."""
+        plan: Dict[str, List[Tuple[str, int]]] = {}
+        for index, column in enumerate(self.feature_columns_):
+            name, stat = column.rsplit('_', 1)
+            if name not in FEATURE_NAMES or stat not in _STATISTICS:
+                raise ValueError(f"Unknown feature column: {column}")
+            plan.setdefault(name, []).append((stat, index))
+        return list(plan.items())
     
     def fit(self, X: Any, y: Optional[Any] = None) -> 'FeatureStatisticsCalculator':
         """Fit method (no-op for transformers)."""
         return self
     
-    def transform(self, X: Dict[str, Dict[str, np.ndarray]]) -> pd.DataFrame:
+    def transform(self, X: Dict[str, Dict[str, np.ndarray]]) -> np.ndarray:
         """
         Calculate statistics for each feature.
         
+        Only the statistics that end up in the output are computed, so excluded
+        columns (e.g. ``mel_spectrogram_min``) cost no pass over their array.
+        
         Args:
             X: Dictionary containing extracted features
             
         Returns:
-            DataFrame with statistical measures for all features
+            Array of statistical measures, one row per file
         """
-        feature_stats = []
-        
-        for filename, features in X.items():
-            file_stats = {'filename': filename}
-            
-            for feature_name, feature_data in features.items():
-                # Calculate statistical measures
-                file_stats[f'{feature_name}_mean'] = np.mean(feature_data)
-                file_stats[f'{feature_name}_std'] = np.std(feature_data)
-                file_stats[f'{feature_name}_max'] = np.max(feature_data)
-                file_stats[f'{feature_name}_min'] = np.min(feature_data)
-            
-            feature_stats.append(file_stats)
-        
-        # Create DataFrame
-        df = pd.DataFrame(feature_stats)
-        
-        # Exclude specified features
-        for feature in self.excluded_features:
-            if feature in df.columns:
-                df = df.drop(feature, axis=1)
-                logger.debug(f"Excluded feature: {feature}")
-        
-        # Keep only numeric columns for prediction
-        numeric_df = df.select_dtypes(exclude=['object'])
-        
-        logger.info(f"Feature statistics calculated. Shape: {numeric_df.shape}")
-        return numeric_df
+        plan = self._reduction_plan()
+        
+        # Fill one contiguous (files x stats) block instead of a dict per file
+        features_array = np.empty((len(X), sum(len(stats) for _, stats in plan)))
+        for row, features in enumerate(X.values()):
+            for name, stats in plan:
+                feature_data = features[name]
+                mean = None
+                for stat, index in stats:
+                    if stat == 'mean':
+                        mean = feature_data.mean(keepdims=True)
+                        features_array[row, index] = mean.item()
+                    elif stat == 'std' and mean is not None and _STD_ACCEPTS_MEAN:
+                        features_array[row, index] = feature_data.std(mean=mean)
+                    else:
+                        features_array[row, index] = getattr(feature_data, stat)()
+        
+        logger.info(f"Feature statistics calculated. Shape: {features_array.shape}")
+        return features_array
 
 
 def create_respiratory_pipeline(
     target_duration: float = 7.8560090702947845,
-    excluded_features: Optional[List[str]] = None
+    excluded_features: Optional[List[str]] = None,
+    n_jobs: Optional[int] = None
 ) -> Pipeline:
     """
     Create a comprehensive pipeline for respiratory sound classification.
@@ -291,6 +451,8 @@ def create_respiratory_pipeline(
     Args:
         target_duration: Target audio duration in seconds
         excluded_features: Features to exclude from processing
+        n_jobs: Worker processes for loading/feature extraction on multi-file
+            batches (-1 uses all CPUs; None keeps everything in-process)
         
     Returns:
         Pipeline: Configured scikit-learn pipeline
@@ -299,9 +461,9 @@ def create_respiratory_pipeline(
         excluded_features = ['mel_spectrogram_min', 'chroma_stft_max']
     
     pipeline = Pipeline([
-        ('load_audio', AudioLoader()),
+        ('load_audio', AudioLoader(n_jobs=n_jobs)),
         ('trim_audio', AudioTrimmer(target_duration=target_duration)),
-        ('extract_features', FeatureExtractor()),
+        ('extract_features', FeatureExtractor(n_jobs=n_jobs)),
         ('calculate_statistics', FeatureStatisticsCalculator(excluded_features=excluded_features))
     ])
     
@@ -309,16 +471,158 @@ def create_respiratory_pipeline(
     return pipeline
 
 
+def warm_up_pipeline(pipeline: Pipeline, sample_rate: int = 22050) -> None:
+    """
+    Run a short synthetic clip through the pipeline's compute stages.
+    
+    Primes lazy librosa/scipy imports, numba-compiled kernels, the mel
+    filterbank cache and BLAS/FFT thread pools so the first real request
+    doesn't pay for them. Loading is skipped; there is no file to read.
+    
+    Args:
+        pipeline: Pipeline from create_respiratory_pipeline
+        sample_rate: Sample rate of the synthetic clip
+    """
+    start_time = time.perf_counter()
+    
+    rng = np.random.default_rng(0)
+    noise = (rng.standard_normal(sample_rate) * 1e-3).astype(np.float32)
+    X: Any = {'warmup': AudioClip(data=noise, sample_rate=sample_rate, duration=1.0)}
+    for _, step in pipeline.steps[1:]:
+        X = step.transform(X)
+    
+    logger.info(f"Pipeline warmed up in {time.perf_counter() - start_time:.2f}s")
+
+
+class OnnxClassifier:
+    """
+    ONNX Runtime session exposing the slice of the sklearn classifier API we use.
+    
+    Tree-ensemble inference in onnxruntime's C++ kernel takes microseconds for a
+    single row, versus ~10 ms of sklearn dispatch over the forest. Produced by
+    export_onnx.py; feature names and the source pickle's hash travel in the
+    model's metadata.
+    """
+    
+    def __init__(self, onnx_path: str) -> None:
+        """
+        Load an exported classifier.
+        
+        Args:
+            onnx_path: Path to the .onnx file
+        """
+        import onnxruntime
+        
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1  # one row per call; threads only add overhead
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.classes_ = np.array([int(c) for c in metadata['classes'].split(',')])
+        self.feature_names_in_ = np.array(metadata['feature_names'].split(','), dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.source_sha256 = metadata.get('source_sha256')
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities, shape (n_samples, n_classes)."""
+        _, probabilities = self.session.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})
+        return probabilities
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Most probable class per row, as RandomForestClassifier.predict does."""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def _check_classes(model: Any) -> Any:
+    """Ensure the model's class codes are 0..7 in DIAGNOSIS_LABELS order."""
+    if list(model.classes_) != list(range(len(DIAGNOSIS_LABELS))):
+        raise ValueError(f"Model classes {list(model.classes_)} do not match the diagnosis labels")
+    return model
+
+
+def model_sha256(model_path: str) -> str:
+    """
+    Hash the pickled model's contents.
+    
+    export_onnx.py stores this digest in the ONNX metadata so load_classifier can
+    tell whether an export was made from the pickle sitting next to it.
+    
+    Args:
+        model_path: Path to the pickled sklearn model
+        
+    Returns:
+        str: Hex SHA-256 digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_classifier(model_path: str) -> Any:
+    """
+    Load the classifier, preferring an ONNX export of this exact pickle.
+    
+    The ``.onnx`` sibling is used only when onnxruntime is installed and the
+    pickle hash recorded at export time matches the pickle on disk, so
+    retraining without re-exporting falls back to the pickle instead of
+    serving a stale model. File timestamps are not used; git checkouts
+    rewrite them arbitrarily. An export that fails to load also falls back
+    to the pickle.
+    
+    Args:
+        model_path: Path to the pickled sklearn model
+        
+    Returns:
+        Classifier with predict/predict_proba
+    """
+    onnx_path = os.path.splitext(model_path)[0] + '.onnx'
+    if os.path.exists(onnx_path):
+        try:
+            model = OnnxClassifier(onnx_path)
+            if model.source_sha256 == model_sha256(model_path):
+                logger.info(f"Loaded ONNX model from: {onnx_path}")
+                return _check_classes(model)
+            logger.warning(f"{onnx_path} was not exported from {model_path}; "
+                           f"using pickled model (re-run export_onnx.py)")
+        except ImportError:
+            logger.info("onnxruntime not installed; using pickled model")
+        except Exception as e:
+            # Corrupt export, opset the installed runtime rejects, or missing metadata
+            logger.warning(f"Could not load {onnx_path} ({str(e)}); using pickled model")
+    
+    logger.info(f"Loading model from: {model_path}")
+    return _check_classes(joblib.load(model_path))
+
+
+@lru_cache(maxsize=4)
+def _get_model(model_path: str) -> BaseEstimator:
+    """Load a classifier once per path and reuse it across calls."""
+    return load_classifier(model_path)
+
+
+@lru_cache(maxsize=1)
+def _get_pipeline() -> Pipeline:
+    """Build the default preprocessing pipeline once; its transformers are stateless."""
+    return create_respiratory_pipeline()
+
+
 def predict_respiratory_condition(
     wav_file_path: str, 
-    model_path: str = 'respiratory_classifier.pkl'
+    model_path: str = 'respiratory_classifier.pkl',
+    model: Optional[BaseEstimator] = None,
+    preprocessing_pipeline: Optional[Pipeline] = None
 ) -> Dict[str, Any]:
     """
     Predict respiratory condition from a WAV file using a saved model.
     
     Args:
         wav_file_path: Path to the WAV audio file
-        model_path: Path to the saved ML model
+        model_path: Path to the saved ML model, used when ``model`` is not given
+        model: Already-loaded classifier, to skip reading ``model_path``
+        preprocessing_pipeline: Already-built pipeline, to skip constructing one
         
     Returns:
         Dict containing prediction results and probabilities
@@ -327,53 +631,45 @@ def predict_respiratory_condition(
         FileNotFoundError: If model or audio file doesn't exist
         ValueError: If prediction fails
     """
-    start_time = time.time()
-    
-    # Validate inputs
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file {model_path} not found")
-    
-    if not os.path.exists(wav_file_path):
-        raise FileNotFoundError(f"Audio file {wav_file_path} not found")
+    start_time = time.perf_counter()
     
     try:
-        # Load the saved model
-        logger.info(f"Loading model from: {model_path}")
-        model = joblib.load(model_path)
+        # Load the saved model (cached per path)
+        if model is None:
+            model = _get_model(model_path)
         
-        # Create preprocessing pipeline
-        preprocessing_pipeline = create_respiratory_pipeline()
+        # Reuse the cached preprocessing pipeline
+        if preprocessing_pipeline is None:
+            preprocessing_pipeline = _get_pipeline()
         
         # Process the audio file
         logger.info(f"Processing audio file: {wav_file_path}")
-        features_df = preprocessing_pipeline.transform([wav_file_path])
-        
-        # Make prediction
-        prediction_code = model.predict(features_df)[0]
-        probabilities = model.predict_proba(features_df)[0]
-        
-        # Get the class with highest probability
-        max_prob = np.max(probabilities)
-        
-        # Map numeric predictions to original class labels
-        diagnosis_labels = [
-            'Asthma', 'Bronchiectasis', 'Bronchiolitis', 'COPD', 
-            'Healthy', 'LRTI', 'Pneumonia', 'URTI'
-        ]
-        
-        # Validate prediction code
-        if prediction_code >= len(diagnosis_labels):
-            raise ValueError(f"Invalid prediction code: {prediction_code}")
-        
-        prediction = diagnosis_labels[prediction_code]
+        features = preprocessing_pipeline.transform([wav_file_path])
+        
+        # Features reach the model as a bare array, so check the column order
+        # against the names it was fitted with
+        feature_columns = preprocessing_pipeline.steps[-1][1].feature_columns_
+        fitted_columns = getattr(model, 'feature_names_in_', None)
+        if fitted_columns is not None and list(fitted_columns) != feature_columns:
+            raise ValueError("Pipeline feature columns do not match the model's training features")
+        
+        # Make prediction; predict() is the argmax of these same probabilities,
+        # and load_classifier checks the class codes line up with DIAGNOSIS_LABELS
+        with warnings.catch_warnings():
+            # The sklearn model was fitted on a DataFrame but gets the bare array;
+            # its column order was checked just above
+            warnings.filterwarnings('ignore', message='X does not have valid feature names',
+                                    category=UserWarning)
+            probabilities = model.predict_proba(features)[0]
+        prediction_code = int(probabilities.argmax())
+        max_prob = probabilities[prediction_code]
+        
+        prediction = DIAGNOSIS_LABELS[prediction_code]
         
         # Create probability dictionary
-        all_probs_dict = {
-            diagnosis_labels[i]: float(prob) 
-            for i, prob in enumerate(probabilities)
-        }
+        all_probs_dict = dict(zip(DIAGNOSIS_LABELS, probabilities.tolist()))
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         
         result = {
             'prediction': prediction,
@@ -381,7 +677,7 @@ def predict_respiratory_condition(
             'probability': float(max_prob),
             'all_probabilities': all_probs_dict,
             'processing_time_seconds': processing_time,
-            'feature_count': len(features_df.columns)
+            'feature_count': features.shape[1]
         }
         
         logger.info(f"Prediction completed: {prediction} (confidence: {max_prob:.2%}) "
@@ -389,6 +685,10 @@ def predict_respiratory_condition(
         
         return result
         
+    except FileNotFoundError:
+        # Missing model or audio file, reported by the open itself
+        raise
+        
     except Exception as e:
         logger.error(f"Prediction failed: {str(e)}", exc_info=True)
         raise ValueError(f"Prediction failed: {str(e)}")
@@ -407,9 +707,18 @@ def validate_model_compatibility(model_path: str) -> Dict[str, Any]:
     Raises:
         FileNotFoundError: If model file doesn't exist
     """
-    if not os.path.exists(model_path):
+    try:
+        mtime = os.path.getmtime(model_path)
+    except OSError:
         raise FileNotFoundError(f"Model file {model_path} not found")
     
+    # Keyed on mtime so a retrained model on the same path is re-validated
+    return dict(_validate_model_cached(model_path, mtime))
+
+
+@lru_cache(maxsize=4)
+def _validate_model_cached(model_path: str, mtime: float) -> Dict[str, Any]:
+    """Unpickle and inspect a model once per (path, modification time)."""
     try:
         model = joblib.load(model_path)
         
@@ -14,7 +14,7 @@ from pathlib import Path
 # Add current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app import app
+from app import app, start_warm_up
 from config import get_config
 from utils import cleanup_temp_files
 
@@ -39,6 +39,9 @@ def setup_signal_handlers() -> None:
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    # Terminal hangup (closed SSH session / parent shell) should also shut down cleanly
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, signal_handler)
 
 
 def validate_environment() -> bool:
@@ -51,8 +54,9 @@ def validate_environment() -> bool:
     logger = logging.getLogger('breathelytics')
     
     # Check if model file exists
-    model_path = Path(__file__).parent / 'respiratory_classifier.pkl'
-    if not model_path.exists():
+    config = get_config()
+    model_path = config.MODEL_PATH
+    if not os.path.exists(model_path):
         logger.warning(f"Model file not found: {model_path}")
         logger.warning("Prediction endpoint will return 503 errors")
     else:
@@ -64,7 +68,6 @@ def validate_environment() -> bool:
         return False
     
     # Check required directories
-    config = get_config()
     try:
         config.init_directories()
         logger.info("Required directories initialized")
@@ -102,22 +105,30 @@ def main() -> None:
     logger.info("=" * 50)
     
     try:
-        # Initialize ML pipeline on startup
-        from pipeline import create_respiratory_pipeline
-        
-        logger.info("Initializing ML pipeline...")
-        pipeline = create_respiratory_pipeline()
-        logger.info("ML pipeline initialized successfully")
+        # Initialize the app's ML pipeline and model in the background while the server binds
+        logger.info("Warming up ML pipeline...")
+        start_warm_up()
         
         # Start the Flask application
-        logger.info("Starting Flask server...")
-        app.run(
-            host='0.0.0.0',  # Override to bind to all interfaces
-            port=config.PORT,
-            debug=config.DEBUG,
-            threaded=True,
-            use_reloader=False  # Disable reloader in production
-        )
+        serve = None
+        if not config.DEBUG:
+            try:
+                from waitress import serve
+            except ImportError:
+                logger.warning("waitress not installed, falling back to Flask development server")
+        
+        if serve is not None:
+            logger.info(f"Starting waitress server with {config.SERVER_THREADS} threads...")
+            serve(app, host='0.0.0.0', port=config.PORT, threads=config.SERVER_THREADS)
+        else:
+            logger.info("Starting Flask server...")
+            app.run(
+                host='0.0.0.0',  # Override to bind to all interfaces
+                port=config.PORT,
+                debug=config.DEBUG,
+                threaded=True,
+                use_reloader=False  # Disable reloader in production
+            )
         
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt, shutting down...")
@@ -5,11 +5,53 @@ Provides helper functions for logging, file validation, and system operations.
 """
 
 import os
+import uuid
+import atexit
 import logging
-from pathlib import Path
-from typing import Optional
+import logging.handlers
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional, Tuple
+import soundfile as sf
 from werkzeug.datastructures import FileStorage
 
+from config import Config
+
+# Log file location, formatters and level names, shared by every setup_logging call
+_LOG_DIR = 'logs'
+_LOG_PATH = os.path.join(_LOG_DIR, 'breathelytics_api.log')
+_DETAILED_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+)
+_SIMPLE_FORMATTER = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_LOG_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+    # Aliases the logging module also defines
+    'WARN': logging.WARN,
+    'FATAL': logging.FATAL,
+    'NOTSET': logging.NOTSET,
+}
+
+# Accepted multipart content types (extensions come from Config.ALLOWED_EXTENSIONS)
+ALLOWED_AUDIO_MIMES = frozenset({
+    'audio/wav', 'audio/wave', 'audio/x-wav',
+    'audio/mpeg', 'audio/mp3',
+    'audio/flac', 'audio/x-flac',
+    'audio/mp4', 'audio/m4a'
+})
+
+# Copy uploads in page-cache sized chunks rather than Werkzeug's 16 KiB default
+UPLOAD_BUFFER_SIZE = 1 << 20
+
+# One reusable copy buffer per worker thread, so uploads don't churn 1 MiB allocations
+_upload_buffers = threading.local()
+
 
 def setup_logging(log_level: str = 'INFO') -> logging.Logger:
     """
@@ -21,37 +63,38 @@ def setup_logging(log_level: str = 'INFO') -> logging.Logger:
     Returns:
         logging.Logger: Configured logger instance
     """
-    # Create logs directory if it doesn't exist
-    log_dir = Path('logs')
-    log_dir.mkdir(exist_ok=True)
-    
-    # Configure logging
-    numeric_level = getattr(logging, log_level.upper(), logging.INFO)
+    logger = logging.getLogger('breathelytics')
+    numeric_level = _LOG_LEVELS.get(log_level.upper(), logging.INFO)
     
-    # Create formatters
-    detailed_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-    )
+    # Already configured (module re-imported or called again): don't stack handlers
+    if logger.handlers:
+        logger.setLevel(numeric_level)
+        return logger
     
-    simple_formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s'
-    )
+    # Create logs directory if it doesn't exist
+    os.makedirs(_LOG_DIR, exist_ok=True)
     
     # Setup file handler for API logs
-    file_handler = logging.FileHandler(log_dir / 'breathelytics_api.log')
+    file_handler = logging.FileHandler(_LOG_PATH)
     file_handler.setLevel(numeric_level)
-    file_handler.setFormatter(detailed_formatter)
+    file_handler.setFormatter(_DETAILED_FORMATTER)
     
     # Setup console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(numeric_level)
-    console_handler.setFormatter(simple_formatter)
+    console_handler.setFormatter(_SIMPLE_FORMATTER)
     
-    # Configure root logger
-    logger = logging.getLogger('breathelytics')
+    # Request threads only enqueue records; a single listener thread does the writes
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Configure application logger
     logger.setLevel(numeric_level)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     # Prevent duplicate logs
     logger.propagate = False
@@ -69,63 +112,195 @@ def validate_audio_file(file: FileStorage) -> bool:
     Returns:
         bool: True if file is valid, False otherwise
     """
-    if not file or not file.filename:
+    filename = file.filename if file else None
+    if not filename:
         return False
     
     # Check file extension
-    allowed_extensions = {'.wav', '.mp3', '.flac', '.m4a'}
-    file_extension = Path(file.filename).suffix.lower()
+    _, dot, file_extension = filename.rpartition('.')
+    if not dot or file_extension.lower() not in Config.ALLOWED_EXTENSIONS:
+        return False
     
-    if file_extension not in allowed_extensions:
+    # Basic content type check (if available), from the multipart headers
+    content_type = file.content_type
+    if content_type and content_type not in ALLOWED_AUDIO_MIMES:
         return False
     
-    # Basic content type check (if available)
-    if file.content_type:
-        allowed_mimes = {
-            'audio/wav', 'audio/wave', 'audio/x-wav',
-            'audio/mpeg', 'audio/mp3',
-            'audio/flac', 'audio/x-flac',
-            'audio/mp4', 'audio/m4a'
-        }
-        if file.content_type not in allowed_mimes:
-            return False
+    # Sniff the container signature so junk uploads never reach the ML pipeline
+    header = file.stream.read(12)
+    file.stream.seek(0)
+    
+    return has_audio_signature(header)
+
+
+def has_audio_signature(header: bytes) -> bool:
+    """
+    Check whether the first bytes of a file match a supported audio container.
+    
+    Args:
+        header: At least the first 12 bytes of the file
+        
+    Returns:
+        bool: True for WAV, FLAC, MP3 or MP4/M4A signatures
+    """
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return True
+    if header[:4] == b'fLaC' or header[:3] == b'ID3' or header[4:8] == b'ftyp':
+        return True
+    # Bare MPEG audio frame: 11-bit frame sync
+    return len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0
+
+
+def _copy_upload(src: BinaryIO, dst: BinaryIO) -> None:
+    """Copy an upload stream into ``dst`` through the thread's reusable buffer."""
+    buffer = getattr(_upload_buffers, 'view', None)
+    if buffer is None:
+        buffer = _upload_buffers.view = memoryview(bytearray(UPLOAD_BUFFER_SIZE))
+    
+    while True:
+        read = src.readinto(buffer)
+        if not read:
+            break
+        dst.write(buffer[:read])
+
+
+def _soundfile_can_decode(path: str) -> bool:
+    """Whether libsndfile recognises the file, so the pipeline never needs an external decoder."""
+    try:
+        sf.info(path)
+        return True
+    except RuntimeError:  # soundfile.LibsndfileError on recent versions
+        return False
+
+
+def _write_named_file(src: BinaryIO, path: str) -> None:
+    """Copy ``src`` to ``path``, removing the partial file if the copy fails."""
+    try:
+        with open(path, 'wb') as out:
+            _copy_upload(src, out)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def spool_upload(file: FileStorage, temp_dir: str, suffix: str = '') -> Tuple[str, Optional[int]]:
+    """
+    Write an uploaded file to disk so the audio decoders can open it by path.
+    
+    On Linux the data goes to an anonymous O_TMPFILE inode that the kernel
+    frees as soon as the returned descriptor is closed, so nothing is left
+    behind if the process dies mid-request. Formats libsndfile cannot decode
+    (e.g. M4A) are handed to audioread's ffmpeg subprocess, which cannot open
+    this process's /proc/self/fd entries, so such uploads get a real name.
+    Elsewhere (or if the filesystem does not support O_TMPFILE) a uniquely
+    named file is created instead.
     
-    return True
+    Args:
+        file: Uploaded file from Flask request
+        temp_dir: Directory to hold the temporary file
+        suffix: Extension for the named file
+        
+    Returns:
+        Tuple[str, Optional[int]]: Readable path and the descriptor to close,
+        or None as descriptor when a named file must be removed by the caller
+    """
+    temp_path = os.path.join(temp_dir, f"{uuid.uuid4()}{suffix}")
+    
+    if hasattr(os, 'O_TMPFILE'):
+        try:
+            fd = os.open(temp_dir, os.O_TMPFILE | os.O_RDWR, 0o600)
+        except OSError:
+            fd = None
+        
+        if fd is not None:
+            fd_path = f"/proc/self/fd/{fd}"
+            try:
+                with os.fdopen(os.dup(fd), 'wb') as out:
+                    _copy_upload(file.stream, out)
+                if _soundfile_can_decode(fd_path):
+                    return fd_path, fd
+                
+                # Replay the spooled bytes into a named file for the external decoder
+                with open(fd_path, 'rb') as spooled:
+                    _write_named_file(spooled, temp_path)
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+            return temp_path, None
+    
+    _write_named_file(file.stream, temp_path)
+    return temp_path, None
 
 
-def cleanup_temp_files(temp_dir: str, max_age_hours: int = 24) -> int:
+def _unlink_temp_file(path: str) -> Optional[bool]:
+    """
+    Remove one temporary file.
+    
+    Returns:
+        Optional[bool]: True if removed, False if it was already gone,
+        None if it could not be removed
+    """
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        # Removed by a concurrent request or cleanup sweep
+        return False
+    except OSError:
+        return None
+
+
+def cleanup_temp_files(temp_dir: str, max_age_hours: int = 24, parallel: bool = False) -> int:
     """
     Clean up old temporary files.
     
     Args:
         temp_dir: Directory containing temporary files
         max_age_hours: Maximum age of files to keep (in hours)
+        parallel: Overlap the unlink calls on a small thread pool; only worth
+            it when temp_dir lives on network or otherwise high-latency storage
         
     Returns:
         int: Number of files cleaned up
     """
-    import time
-    
-    if not os.path.exists(temp_dir):
-        return 0
-    
-    current_time = time.time()
-    max_age_seconds = max_age_hours * 3600
-    cleaned_count = 0
+    # Stay in integer nanoseconds; mtime is wall-clock, so compare against time_ns()
+    current_ns = time.time_ns()
+    max_age_ns = int(max_age_hours * 3600 * 1_000_000_000)
+    stale_paths = []
     
     try:
-        for filename in os.listdir(temp_dir):
-            file_path = os.path.join(temp_dir, filename)
-            
-            if os.path.isfile(file_path):
-                file_age = current_time - os.path.getmtime(file_path)
-                
-                if file_age > max_age_seconds:
-                    os.remove(file_path)
-                    cleaned_count += 1
+        # scandir yields the file type with each directory entry, so only
+        # regular files cost a stat() for their modification time
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    
+                    file_age_ns = current_ns - entry.stat(follow_symlinks=False).st_mtime_ns
                     
+                    if file_age_ns > max_age_ns:
+                        stale_paths.append(entry.path)
+                
+                except FileNotFoundError:
+                    continue
+    
+    except FileNotFoundError:
+        return 0
+    
     except Exception as e:
-        logger = logging.getLogger('breathelytics')
-        logger.warning(f"Error during temp file cleanup: {str(e)}")
+        logging.getLogger('breathelytics').warning(f"Error during temp file cleanup: {str(e)}")
+    
+    if parallel and len(stale_paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(16, len(stale_paths))) as executor:
+            results = list(executor.map(_unlink_temp_file, stale_paths))
+    else:
+        results = [_unlink_temp_file(path) for path in stale_paths]
+    
+    failed_paths = [path for path, removed in zip(stale_paths, results) if removed is None]
+    if failed_paths:
+        logging.getLogger('breathelytics').warning(f"Could not remove {len(failed_paths)} temp file(s): {', '.join(failed_paths)}")
     
-    return cleaned_count 
\ No newline at end of file
+    return results.count(True)
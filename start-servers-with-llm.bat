@@ -12,21 +12,18 @@ echo Stopping existing servers...
 taskkill /f /im python.exe 2>nul
 timeout /t 2 /nobreak >nul
 
-REM Start Backend Server in background
+REM Start Backend and Frontend Servers in background (they boot independently)
 echo Starting Backend Server with LLM...
 cd src\breathelytics-backend
 start /b python app.py > backend.log 2>&1
 
-REM Wait for backend to start
-timeout /t 5 /nobreak >nul
-
-REM Start Frontend Server in background
 echo Starting Frontend Server...
 cd ..\breathelytics-frontend
 start /b python -m http.server 8080 > frontend.log 2>&1
 
-REM Wait a moment for servers to initialize
-timeout /t 2 /nobreak >nul
+REM Wait for both servers to answer (poll instead of fixed delays)
+curl -s -o nul --retry 10 --retry-delay 1 --retry-connrefused --retry-max-time 10 http://localhost:5000/api/health
+curl -s -o nul --retry 5 --retry-delay 1 --retry-connrefused --retry-max-time 5 http://localhost:8080/
 
 echo.
 echo =====================================================